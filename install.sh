@@ -1,4 +1,6 @@
 #!/bin/bash
 
 pip3 install pyyaml # dependency for loading our config.yml file
+pip3 install pymysql # dependency for 'slabcli pull --databases'
+pip3 install zstandard # dependency for multi-threaded 'slabcli backup' compression
 pip3 install -e .   # installs slabcli package in editable mode
@@ -1,6 +1,6 @@
 import sys
 import argparse
-from slabcli.commands import power, push, pull
+from slabcli.commands import backup, diff, power, push, pull
 from slabcli.common.cli import clifmt
 
 def main():
@@ -33,6 +33,17 @@ def add_subcommands(parser: argparse.ArgumentParser):
     pull.add_arguments(pull_parser)
     pull_parser.set_defaults(func=pull.run)
 
+    # Diff subcommand
+    diff_parser = subparsers.add_parser('diff', help='Show which files differ between Staging and Production')
+    diff.add_arguments(diff_parser)
+    diff_parser.set_defaults(func=diff.run)
+
+    # Backup subcommand
+    backup_parser = subparsers.add_parser('backup', help='Back up Staging or Production server files to compressed archives')
+    backup_parser.add_argument("target", choices=["production", "staging"], help="Servers to back up")
+    backup.add_arguments(backup_parser)
+    backup_parser.set_defaults(func=backup.run)
+
     # Stop subcommand
     stop_parser = subparsers.add_parser('stop', help='Stop Staging or Production servers')
     stop_parser.add_argument("target", choices=["production", "staging"], help="Servers to stop")
@@ -0,0 +1,72 @@
+import os
+import argparse
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from slabcli import config
+from slabcli.core import backup
+from slabcli.core.sync import PTERO_ROOT
+from slabcli.core.ptero import stop_servers, start_servers, get_server_status, OFFLINE_STATE
+from slabcli.common.cli import clifmt, abort_cli
+
+# Paths that are never copied out of each server type are also left out of its backups
+EXEMPT_PATHS_KEY = {"production": "exempt_pull_paths", "staging": "exempt_push_paths"}
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--output', '-o', help='directory to write backups to (default: backup.directory in config.yml)')
+    parser.add_argument('--incremental', '-i', action='store_true', help='only archive files that changed since the latest backup manifest of each server')
+    parser.add_argument('--stop-servers', '-s', action='store_true', help='stop any running servers before backing up and start them again afterwards')
+    parser.add_argument('--threads', '-t', type=int, default=-1, help='total zstd compression threads, split evenly between servers (default: one per CPU core)')
+    parser.add_argument('--level', '-l', type=int, default=3, help='zstd compression level (default: 3)')
+
+def run(args):
+    cfg = config.load_config()
+    servers = cfg["servers"].get(args.target, {})
+    exempt_paths = list(cfg["replacements"].get(EXEMPT_PATHS_KEY[args.target], []))
+
+    output_dir = args.output or cfg.get("backup", {}).get("directory")
+    if not output_dir:
+        print(clifmt.FAIL + "No backup directory set, use --output or set backup.directory in config.yml")
+        abort_cli(args.subcommand)
+    os.makedirs(output_dir, exist_ok=True)
+
+    if backup.archive_extension() == ".tar.gz":
+        print(clifmt.WARNING + "The 'zstandard' package is not installed, falling back to single-threaded gzip compression")
+
+    print(clifmt.LIGHT_GRAY + f"Backing up {args.target.capitalize()} servers to {output_dir}")
+    print(clifmt.LIGHT_GRAY + "exempt paths =", exempt_paths)
+
+    # Only servers that were running are stopped, and started again afterwards
+    running_servers = {}
+    if args.stop_servers:
+        running_servers = {name: server_id for name, server_id in servers.items() if get_server_status(server_id) != OFFLINE_STATE}
+        if running_servers:
+            stop_servers(running_servers)
+
+    # Every server is archived at once, so each gets its share of the threads rather than all of them
+    total_threads = (os.cpu_count() or 1) if args.threads == -1 else args.threads
+    threads = max(1, total_threads // max(len(servers), 1))
+
+    timestamp = datetime.now(tz=timezone.utc).strftime("%Y%m%d-%H%M%S")
+    failed = False
+    try:
+        with ThreadPoolExecutor(max_workers=max(len(servers), 1)) as pool:
+            futures = {}
+            for name, server_id in servers.items():
+                prefix = f"{args.target}-{name}"
+                base_manifest = backup.find_latest_manifest(output_dir, prefix) if args.incremental else None
+                archive_base = os.path.join(output_dir, f"{prefix}-{timestamp}")
+                futures[pool.submit(backup.backup_server, name, PTERO_ROOT + server_id, archive_base,
+                                    exempt_paths, base_manifest, threads, args.level)] = name
+
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failed = True
+                    print(clifmt.FAIL + f"Failed to back up {futures[future]}: {e}")
+    finally:
+        if running_servers:
+            start_servers(running_servers)
+
+    if failed:
+        abort_cli(args.subcommand)
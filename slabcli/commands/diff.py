@@ -0,0 +1,98 @@
+import time
+import argparse
+from slabcli import config
+from slabcli.core import config_index, fingerprint, rewrite, sync
+from slabcli.core.diff import compare_trees, group_by_plugin, ADDED, REMOVED, MODIFIED, REPLACED
+from slabcli.common.cli import clifmt
+from slabcli.common.utils import substring_in_string
+
+CHANGE_FORMAT = {
+    ADDED: (clifmt.OKGREEN, "+"),
+    REMOVED: (clifmt.FAIL, "-"),
+    MODIFIED: (clifmt.WARNING, "~"),
+}
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--all-files', '-a', action='store_true', help='compare every file, not just those allowed to be pushed in config.yml')
+    parser.add_argument('--summary', '-s', action='store_true', help='only show the number of changed files per plugin')
+
+def run(args):
+    cfg = config.load_config()
+    start = time.time()
+
+    source, dest = sync.SERVER_DIRECTIONS[sync.PUSH]
+    source_servers = cfg["servers"].get(source, {})
+    dest_servers = cfg["servers"].get(dest, {})
+
+    include = None
+    if not args.all_files:
+        push_paths = list(cfg["replacements"].get("allowed_push_paths", []))
+        push_files = list(cfg["replacements"].get("allowed_push_files", []))
+        push_filetypes = list(cfg["replacements"].get("allowed_push_filetypes", []))
+        exempt_paths = list(cfg["replacements"].get("exempt_push_paths", []))
+        include = lambda path: sync.should_push_file(path, push_paths, push_filetypes, push_files, exempt_paths)
+
+    print(clifmt.LIGHT_GRAY + f"Comparing {source.capitalize()} to {dest.capitalize()}: "
+          f"{clifmt.OKGREEN}+ only in {source.capitalize()}{clifmt.LIGHT_GRAY}, "
+          f"{clifmt.FAIL}- only in {dest.capitalize()}{clifmt.LIGHT_GRAY}, {clifmt.WARNING}~ modified")
+    print('')
+
+    cache = fingerprint.load_cache()
+    normalise = build_normaliser(cfg, source, dest, cache)
+    total = 0
+    for name in source_servers:
+        if name not in dest_servers:
+            print(f"Skipping {name}, no matching {dest.capitalize()} server.")
+            continue
+
+        changes = compare_trees(sync.PTERO_ROOT + source_servers[name], sync.PTERO_ROOT + dest_servers[name], include, cache,
+                                normalise=normalise)
+        total += sum(1 for change in changes.values() if change != REPLACED)
+        print_changes(name, changes, args.summary)
+    fingerprint.save_cache(cache)
+
+    print(clifmt.WHITE + f"{total} files differ between {source.capitalize()} and {dest.capitalize()} ({time.time() - start:.1f}s)")
+
+def build_normaliser(cfg, source, dest, cache):
+    """
+    Build a compare_trees() normaliser that predicts a Staging config file's checksum after a push
+    rewrites it with the replacements from config.yml, so those differences aren't reported as changes.
+    Results are cached per file and ruleset in the fingerprint cache.
+    """
+    replacements, _ = config.compute_config_replacements(
+        cfg["replacements"].get(source, {}),
+        cfg["replacements"].get(dest, {})
+    )
+    coreprotect = sync.coreprotect_replacements(sync.PUSH)
+    exempt_paths = list(cfg["replacements"].get("exempt_push_paths", []))
+    ruleset = config_index.ruleset_hash([replacements, coreprotect], exempt_paths)
+
+    def normalise(path, size, mtime_ns):
+        if not path.endswith(sync.CONFIG_EXTENSIONS) or substring_in_string(exempt_paths, path):
+            return None
+        replacement_sets = [replacements, coreprotect] if sync.is_coreprotect_path(path) else [replacements]
+        return fingerprint.cached_result(cache, f"{path}#{ruleset}", size, mtime_ns,
+                                         lambda: rewrite.replaced_checksum(path, replacement_sets))
+    return normalise
+
+def print_changes(name, changes, summary):
+    replaced = sum(1 for change in changes.values() if change == REPLACED)
+    changes = {rel_path: change for rel_path, change in changes.items() if change != REPLACED}
+    replaced_text = f" ({replaced} more only differ by config.yml replacements)" if replaced else ""
+
+    if not changes:
+        print(clifmt.OKGREEN + f"{name}: no differences{replaced_text}")
+        print('')
+        return
+
+    print(clifmt.BOLD + f"{name}: {len(changes)} files differ{replaced_text}")
+    for group, entries in group_by_plugin(changes).items():
+        counts = {change: sum(1 for _, c in entries if c == change) for change in CHANGE_FORMAT}
+        count_text = ", ".join(f"{n} {change}" for change, n in counts.items() if n)
+        print(clifmt.WHITE + f"  {group} ({count_text})")
+        if summary:
+            continue
+        for rel_path, change in entries:
+            color, symbol = CHANGE_FORMAT[change]
+            print(color + f"    {symbol} {rel_path}")
+    print('')
@@ -1,10 +1,10 @@
 import os
 import argparse
-import hashlib
 from slabcli import config
 from slabcli.core import sync
 from datetime import datetime, timezone
 from slabcli.common.cli import clifmt, abort_cli
+from slabcli.common.utils import file_checksum
 from slabcli.core.ptero import restart_servers, are_servers_at_state
 
 
@@ -12,6 +12,10 @@ def add_arguments(parser: argparse.ArgumentParser) -> None:
     parser.add_argument('--update-only', '-u', action='store_true', help='pull the config changes only, with no copying of files at all')
     parser.add_argument('--force-reset', '-f', action='store_true', help='force Staging to be reset by Production even if .jar files differ')
     parser.add_argument('--dry-run', '-y', action='store_true', help='skip prompts, and only show which changes would be pulled to Staging. Useful for writing to log files.')
+    parser.add_argument('--server', '-s', action='append', dest='servers', metavar='NAME', help='only pull this server, e.g. survival (can be repeated)')
+    parser.add_argument('--path', '-p', action='append', dest='paths', metavar='PATH', help='only pull this file or folder within each server, e.g. plugins/Foo (can be repeated)')
+    parser.add_argument('--databases', '-d', action='store_true', help='also copy the plugin database tables listed in config.yml from Production to Staging (ignored with --update-only)')
+    parser.add_argument('--incremental', '-i', action='store_true', help='with --databases, only copy rows newer than those already in Staging for tables with an incremental key')
 
 def run(args):
     cfg = config.load_config()
@@ -40,12 +44,17 @@ def print_cmd_info(args, cfg):
         print(clifmt.OKCYAN + f"Last update of Staging config files from SlabCLI's config.yml occurred at: {ts_readable}")
     print('')
 
+    if args.servers or args.paths:
+        print(clifmt.WARNING + f"Only syncing servers: {', '.join(args.servers or ['all'])}, paths: {', '.join(args.paths or ['all'])}")
+
     if args.update_only:
         print(clifmt.WARNING + 'This will only update existing config files with values defined in SlabCLI\'s config.yml, as --update-only is set')
         print(clifmt.BOLD + 'Are you certain that Staging has all required config files from Production?')
     else:
         print(clifmt.WARNING + 'This will stop the Staging servers, pull the Slabserver files and folders from Production to Staging, and update files with values defined in SlabCLI\'s config.yml')
         print(clifmt.BOLD + 'Please ensure you are ready for any Staging changes to be reset by Production')
+        if args.databases:
+            print(clifmt.WARNING + 'Plugin database tables listed in config.yml will also be copied from Production to Staging')
     print('')
 
     if not jar_files_match(cfg) and not args.update_only and not args.dry_run:
@@ -87,11 +96,3 @@ def jar_files_match(cfg):
 
 def files_match(path1, path2):
     return file_checksum(path1) == file_checksum(path2)
-
-def file_checksum(path, algo="sha256", chunk_size=8192):
-    h = hashlib.new(algo)
-    with open(path, "rb") as f:
-        while chunk := f.read(chunk_size):
-            h.update(chunk)
-    return h.hexdigest()
-
@@ -7,6 +7,8 @@ from datetime import datetime, timezone
 def add_arguments(parser):
     parser.add_argument('--update-only', '-u', action='store_true', help='push the config changes only, with no copying of files at all')
     parser.add_argument('--dry-run', '-y', action='store_true', help='skip prompts, and only show which changes would be pushed to Production. Useful for writing to log files.')
+    parser.add_argument('--server', '-s', action='append', dest='servers', metavar='NAME', help='only push this server, e.g. survival (can be repeated)')
+    parser.add_argument('--path', '-p', action='append', dest='paths', metavar='PATH', help='only push this file or folder within each server, e.g. plugins/Foo (can be repeated)')
 
 def run(args):
     cfg = config.load_config()
@@ -43,6 +45,9 @@ def print_cmd_info(args, cfg):
         print(clifmt.OKCYAN + f"Last update of Production config files from SlabCLI's config.yml occurred at: {ts_readable}")
     print('')
 
+    if args.servers or args.paths:
+        print(clifmt.WARNING + f"Only syncing servers: {', '.join(args.servers or ['all'])}, paths: {', '.join(args.paths or ['all'])}")
+
     print(clifmt.WARNING + 'This will stop the Production servers, push files and folders defined in config.yml from Staging to Production, and update files with values defined in SlabCLI\'s config.yml')
     print(clifmt.BOLD + 'Please ensure Staging has been tested, Production has very recent backups, & lockdown is set in the Bouncer/persistent.yml if required.')
 
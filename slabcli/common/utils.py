@@ -1,4 +1,5 @@
 import os
+import hashlib
 import requests
 
 
@@ -42,6 +43,14 @@ def file_has_extension(filename, extensions):
     """Return True if filename ends with one of the given extensions."""
     return filename.lower().endswith(tuple(ext.lower() for ext in extensions))
 
+def file_checksum(path, algo="sha256", chunk_size=1024 * 1024):
+    """Return the hex digest of a file's contents, read in chunks to avoid loading it into memory."""
+    h = hashlib.new(algo)
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
 def file_newer_than(file, timestamp):
     """Return True if file was modified more recently than the provided timestamp."""
 
@@ -9,6 +9,12 @@ missing_keys = False
 def get_config_path():
     return files("slabcli").joinpath("config.yml")
 
+def get_state_path(filename):
+    """Return the path of a SlabCLI state/cache file, kept in a 'state' folder next to config.yml"""
+    state_dir = files("slabcli").joinpath("state")
+    os.makedirs(state_dir, exist_ok=True)
+    return state_dir.joinpath(filename)
+
 def load_config():
     config_path = get_config_path()
     with config_path.open("r") as f:
@@ -0,0 +1,116 @@
+import os
+import glob
+import json
+import time
+import tarfile
+from slabcli.core import fingerprint
+from slabcli.common.cli import clifmt
+from slabcli.common.utils import substring_in_string
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def archive_extension():
+    """Return the archive extension, preferring zstd and falling back to single-threaded gzip if zstandard isn't installed."""
+    try:
+        import zstandard  # noqa: F401
+        return ".tar.zst"
+    except ImportError:
+        return ".tar.gz"
+
+def open_archive(path, threads, level):
+    """
+    Open a streaming tar archive for writing, compressed with multi-threaded zstd when available.
+
+    :param threads: zstd worker threads, -1 for one per CPU core
+    :param level: Compression level, only used for zstd
+    :return: (tarfile, [other file objects to close after the tarfile])
+    """
+    if archive_extension() == ".tar.gz":
+        return tarfile.open(path, "w|gz"), []
+
+    import zstandard
+    fh = open(path, "wb")
+    writer = zstandard.ZstdCompressor(level=level, threads=threads).stream_writer(fh)
+    return tarfile.open(fileobj=writer, mode="w|"), [writer, fh]
+
+def find_latest_manifest(output_dir, prefix):
+    """Return the newest manifest path for an archive prefix such as 'production-survival', or None."""
+    manifests = sorted(glob.glob(os.path.join(output_dir, f"{prefix}-*{MANIFEST_SUFFIX}")))
+    return manifests[-1] if manifests else None
+
+def load_manifest(path):
+    with open(path) as f:
+        return json.load(f)
+
+def backup_server(name, server_root, archive_base, exempt_paths, base_manifest_path=None, threads=-1, level=3):
+    """
+    Stream a server root into a compressed tar archive and write a manifest alongside it.
+
+    The manifest lists the size and mtime of every file in the server root, and every directory.
+    Directories are archived as entries of their own so a restore keeps their owner and
+    permissions, and empty ones aren't lost. When a previous manifest is given, only files that
+    are new or have a different size/mtime and new directories are archived, and paths that no
+    longer exist are listed under 'deleted', so restoring means extracting the full backup
+    followed by each incremental backup in order.
+
+    :param archive_base: Output path without extension, e.g. '/backups/production-survival-20250101-030000'
+    :return: The manifest dict that was written
+    """
+    include = lambda path: not substring_in_string(exempt_paths, path)
+    files, dirs = fingerprint.scan_tree(server_root, include, directories=True)
+
+    base_files = {}
+    base_dirs = set()
+    base_name = None
+    if base_manifest_path:
+        base_manifest = load_manifest(base_manifest_path)
+        base_files = base_manifest.get("files", {})
+        base_dirs = set(base_manifest.get("directories", []))
+        base_name = base_manifest.get("archive")
+
+    # Sorted so each directory entry comes before its contents
+    to_archive = sorted([rel_path for rel_path, stat in files.items() if base_files.get(rel_path) != list(stat)]
+                        + list(dirs - base_dirs))
+
+    archive_path = archive_base + archive_extension()
+    partial_path = archive_path + ".partial"
+    archived = 0
+    try:
+        tar, others = open_archive(partial_path, threads, level)
+        try:
+            for rel_path in to_archive:
+                try:
+                    tar.add(os.path.join(server_root, rel_path), arcname=rel_path, recursive=False)
+                except FileNotFoundError:
+                    # Deleted since the scan (e.g. a rotated log), so it's left out of the manifest too
+                    files.pop(rel_path, None)
+                    dirs.discard(rel_path)
+                    continue
+                if rel_path in files:
+                    archived += 1
+        finally:
+            tar.close()
+            for f in others:
+                f.close()
+        os.replace(partial_path, archive_path)
+    finally:
+        # Never leave a truncated archive behind if the backup failed
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+    manifest = {
+        "server": name,
+        "archive": os.path.basename(archive_path),
+        "base": base_name,
+        "created": int(time.time()),
+        "files": {rel_path: list(stat) for rel_path, stat in files.items()},
+        "directories": sorted(dirs),
+        "deleted": sorted((base_files.keys() - files.keys()) | (base_dirs - dirs)),
+    }
+    with open(archive_base + MANIFEST_SUFFIX, "w") as f:
+        json.dump(manifest, f)
+
+    kind = f"incremental on {base_name}" if base_name else "full"
+    print(clifmt.GREEN + f"Archived {archived}/{len(files)} files for {name} ({kind}): {archive_path}")
+    return manifest
@@ -0,0 +1,88 @@
+import os
+import json
+import hashlib
+from slabcli import config
+from slabcli.common.utils import file_checksum
+
+INDEX_FILE = "config_index.json"
+
+
+def load_index():
+    """
+    Load the persistent config index, or an empty one if missing/corrupt. It holds:
+    - 'replacements': the last computed replacements per direction, with a hash of the config they came from
+    - 'files': {path: [size, mtime_ns, checksum, ruleset hash]} of each config file after it was last processed
+    """
+    try:
+        with config.get_state_path(INDEX_FILE).open("r") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    index.setdefault("replacements", {})
+    index.setdefault("files", {})
+    return index
+
+def save_index(index):
+    path = config.get_state_path(INDEX_FILE)
+    tmp_path = str(path) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, path)
+
+def hash_data(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+def ruleset_hash(replacement_sets, exempt_paths):
+    """Hash every set of replacements applied to a file, plus exemptions, independent of dict ordering."""
+    return hash_data([[sorted([str(k), str(v)] for k, v in r.items()) for r in replacement_sets], sorted(exempt_paths)])
+
+def cached_replacements(index, direction, source_cfg, dest_cfg):
+    """Return the replacements computed for the same source/destination config on a previous run, or None."""
+    cached = index["replacements"].get(direction)
+    if cached and cached["config_hash"] == hash_data([source_cfg, dest_cfg]):
+        return {k: v for k, v in cached["replacements"]}
+    return None
+
+def cache_replacements(index, direction, source_cfg, dest_cfg, replacements):
+    # Stored as [key, value] pairs, as JSON would turn non-string keys (e.g. ports) into strings
+    index["replacements"][direction] = {
+        "config_hash": hash_data([source_cfg, dest_cfg]),
+        "replacements": [[k, v] for k, v in replacements.items()],
+    }
+
+def is_unchanged(index, path, ruleset):
+    """
+    Return True if `path` was already processed with this ruleset and hasn't changed since.
+
+    Files with the same size and mtime as recorded are skipped without being read. If only
+    the mtime differs, the content hash decides instead.
+    """
+    entry = index["files"].get(path)
+    if not entry or entry[3] != ruleset:
+        return False
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    if entry[0] != st.st_size:
+        return False
+    if entry[1] == st.st_mtime_ns:
+        return True
+    if entry[2] and file_checksum(path) == entry[2]:
+        entry[1] = st.st_mtime_ns
+        return True
+    return False
+
+def record(index, path, checksum, ruleset):
+    """
+    Record the current size and mtime of a file after it was processed with `ruleset`.
+
+    :param checksum: Content hash from the rewrite stream, so the file isn't read again (None for skipped binary files)
+    """
+    st = os.stat(path)
+    index["files"][path] = [st.st_size, st.st_mtime_ns, checksum, ruleset]
+
+def prune(index):
+    """Drop index entries for files that no longer exist."""
+    for path in [path for path in index["files"] if not os.path.isfile(path)]:
+        del index["files"][path]
@@ -0,0 +1,229 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from slabcli import config
+from slabcli.common.cli import clifmt
+
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_SIZE = 1000
+HIGH_WATER_FILE = "database_high_water.json"
+
+MARIADB = "mariadb"
+SQLITE = "sqlite"
+
+
+class DatabaseAdapter:
+    """
+    Thin wrapper around a DB-API 2.0 driver, hiding the differences between
+    MariaDB/MySQL (pymysql) and SQLite that matter for copying tables.
+
+    :param conn_cfg: Connection settings from the 'databases' section of config.yml
+    """
+
+    def __init__(self, conn_cfg: dict):
+        self.cfg = conn_cfg or {}
+        self.driver = self.cfg.get("driver", MARIADB)
+        if self.driver not in (MARIADB, SQLITE):
+            raise ValueError(f"Unknown database driver: {self.driver}")
+        self.placeholder = "?" if self.driver == SQLITE else "%s"
+
+    def connect(self, schema: str, streaming: bool = False):
+        """
+        Opens a new connection to `schema`.
+
+        :param schema: Database (MariaDB) or file name without extension (SQLite)
+        :param streaming: Use an unbuffered cursor so large SELECTs are not loaded into memory
+        :return: DB-API connection object
+        """
+        if self.driver == SQLITE:
+            import sqlite3
+            return sqlite3.connect(os.path.join(self.cfg.get("path", "."), schema + ".db"))
+
+        try:
+            import pymysql
+            import pymysql.cursors
+        except ImportError as e:
+            raise RuntimeError("Database sync requires the 'pymysql' package, run install.sh again") from e
+
+        return pymysql.connect(
+            host=self.cfg.get("host", "localhost"),
+            port=int(self.cfg.get("port", 3306)),
+            user=self.cfg.get("user"),
+            password=self.cfg.get("password"),
+            database=schema,
+            charset="utf8mb4",
+            cursorclass=pymysql.cursors.SSCursor if streaming else pymysql.cursors.Cursor,
+        )
+
+    def quote(self, identifier: str) -> str:
+        """Quote a table or column name. SQLite also understands MySQL-style backticks."""
+        return "`" + str(identifier).replace("`", "``") + "`"
+
+
+def parse_tables(tables):
+    """Normalise 'tables' entries into (name, incremental_key) tuples. Entries are either a name or {name: {incremental: key}}."""
+    parsed = []
+    for table in tables or []:
+        if isinstance(table, dict):
+            for name, opts in table.items():
+                parsed.append((name, (opts or {}).get("incremental")))
+        else:
+            parsed.append((table, None))
+    return parsed
+
+
+def load_high_water():
+    """Load the persistent {table id: highest source key copied} state, or an empty one if missing/corrupt."""
+    try:
+        with config.get_state_path(HIGH_WATER_FILE).open("r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_high_water(high_water):
+    path = config.get_state_path(HIGH_WATER_FILE)
+    tmp_path = str(path) + ".tmp"
+    with open(tmp_path, "w") as f:
+        # Timestamps are stored as 'YYYY-MM-DD HH:MM:SS' strings, which both drivers compare correctly
+        json.dump(high_water, f, default=str)
+    os.replace(tmp_path, path)
+
+def high_water_id(source_schema, dest_schema, table, incremental_key):
+    return f"{source_schema}.{table} -> {dest_schema}.{table} ({incremental_key})"
+
+def copy_table(source_adapter, dest_adapter, source_schema, dest_schema, table, incremental_key=None,
+               high_water=None, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """
+    Stream a single table from the source schema into the matching destination table.
+
+    A full copy empties the destination table and re-inserts every row in one transaction.
+    An incremental copy (when `high_water` is given) first deletes destination rows whose
+    `incremental_key` (an auto-increment primary key or an 'updated at' timestamp) is above
+    `high_water`, the highest source value copied last time, as those were created on the
+    destination itself. It then fetches only source rows above `high_water` and upserts them
+    with REPLACE so updated rows overwrite their old copy.
+
+    :param incremental_key: Column to track the highest copied source value of, for later incremental copies
+    :param high_water: Highest source value of `incremental_key` copied by a previous run, or None for a full copy
+    :return: (number of rows copied or that would be copied in a dry run, new high water value or None)
+    """
+    source = source_adapter.connect(source_schema, streaming=True)
+    dest = dest_adapter.connect(dest_schema)
+    try:
+        dest_cur = dest.cursor()
+        src_cur = source.cursor()
+        source_table = source_adapter.quote(table)
+        dest_table = dest_adapter.quote(table)
+        incremental = incremental_key and high_water is not None
+
+        where, order, params = "", "", ()
+        if incremental:
+            where = f" WHERE {source_adapter.quote(incremental_key)} > {source_adapter.placeholder}"
+            params = (high_water,)
+        if incremental_key:
+            order = f" ORDER BY {source_adapter.quote(incremental_key)}"
+
+        if dry_run:
+            src_cur.execute(f"SELECT COUNT(*) FROM {source_table}{where}", params)
+            count = src_cur.fetchone()[0]
+            src_cur.close()
+            return count, high_water
+
+        if incremental:
+            dest_cur.execute(f"DELETE FROM {dest_table} WHERE {dest_adapter.quote(incremental_key)} > {dest_adapter.placeholder}",
+                             (high_water,))
+        else:
+            dest_cur.execute(f"DELETE FROM {dest_table}")
+
+        src_cur.execute(f"SELECT * FROM {source_table}{where}{order}", params)
+        names = [d[0] for d in src_cur.description]
+        columns = ", ".join(dest_adapter.quote(name) for name in names)
+        values = ", ".join([dest_adapter.placeholder] * len(names))
+        verb = "REPLACE" if incremental else "INSERT"
+        insert = f"{verb} INTO {dest_table} ({columns}) VALUES ({values})"
+        key_index = names.index(incremental_key) if incremental_key else None
+
+        count = 0
+        while rows := src_cur.fetchmany(batch_size):
+            dest_cur.executemany(insert, rows)
+            count += len(rows)
+            if key_index is not None:
+                # Rows are ordered by the key, so the last one holds the highest value
+                high_water = rows[-1][key_index]
+
+        src_cur.close()
+        dest.commit()
+        return count, high_water
+    except Exception:
+        dest.rollback()
+        raise
+    finally:
+        source.close()
+        dest.close()
+
+
+def sync_databases(args, cfg, source, dest, print_prefix="", servers=None):
+    """
+    Copy every table listed under 'databases.schemas' in config.yml from the source schema
+    to the matching destination schema, several tables at a time.
+
+    :param source: Config key of the source connection, e.g. 'production'
+    :param dest: Config key of the destination connection, e.g. 'staging'
+    :param servers: Server names selected with --server. If given, only schemas whose 'servers'
+                    list includes one of them are copied, and schemas without a 'servers' list are skipped.
+    :return: True if every table was copied successfully
+    """
+    db_cfg = cfg.get("databases", {})
+    schemas = db_cfg.get("schemas", [])
+    if not schemas:
+        print(clifmt.WARNING + "No databases defined in config.yml, skipping database sync")
+        return True
+
+    invalid = [i for i, schema in enumerate(schemas) if not isinstance(schema, dict) or not schema.get(source) or not schema.get(dest)]
+    if invalid:
+        for i in invalid:
+            print(clifmt.FAIL + f"{print_prefix}databases.schemas entry {i + 1} in config.yml must set both '{source}' and '{dest}' schema names")
+        return False
+
+    source_adapter = DatabaseAdapter(db_cfg.get(source))
+    dest_adapter = DatabaseAdapter(db_cfg.get(dest))
+    batch_size = int(db_cfg.get("batch_size", DEFAULT_BATCH_SIZE))
+    workers = int(db_cfg.get("workers", DEFAULT_WORKERS))
+    incremental = getattr(args, "incremental", False)
+    high_water = load_high_water()
+
+    # Tables without an incremental key, or that were never copied before, are always copied in full
+    jobs = []
+    for schema in schemas:
+        if servers and not set(servers) & set(schema.get("servers", [])):
+            print(clifmt.LIGHT_GRAY + f"{print_prefix}Skipping {schema[source]}, as it isn't used by the selected servers")
+            continue
+        for table, key in parse_tables(schema.get("tables")):
+            jobs.append((schema[source], schema[dest], table, key))
+
+    print(clifmt.WHITE + f"{print_prefix}Copying {len(jobs)} database tables from {source.capitalize()} to {dest.capitalize()}...")
+
+    success = True
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for src_schema, dest_schema, table, key in jobs:
+            previous = high_water.get(high_water_id(src_schema, dest_schema, table, key)) if key and incremental else None
+            future = pool.submit(copy_table, source_adapter, dest_adapter, src_schema, dest_schema, table, key,
+                                 previous, batch_size, args.dry_run)
+            futures[future] = (src_schema, dest_schema, table, key, previous)
+
+        for future in as_completed(futures):
+            src_schema, dest_schema, table, key, previous = futures[future]
+            mode = f"incremental on {key}" if previous is not None else "full"
+            try:
+                count, new_high_water = future.result()
+                print(clifmt.GREEN + f"{print_prefix}Copied {count} rows ({mode}): {src_schema}.{table} -> {dest_schema}.{table}")
+                # Persisted after every committed table, so a later failure can't lose track of what was copied
+                if key and new_high_water is not None and not args.dry_run:
+                    high_water[high_water_id(src_schema, dest_schema, table, key)] = new_high_water
+                    save_high_water(high_water)
+            except Exception as e:
+                success = False
+                print(clifmt.FAIL + f"{print_prefix}Failed to copy {src_schema}.{table} -> {dest_schema}.{table}: {e}")
+
+    return success
@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from slabcli.core import fingerprint
+
+ADDED = "added"
+REMOVED = "removed"
+MODIFIED = "modified"
+REPLACED = "replaced"
+
+
+def compare_trees(source_root, dest_root, include=None, cache=None, workers=fingerprint.DEFAULT_WORKERS, normalise=None):
+    """
+    Compare two server roots and classify every file that differs.
+
+    Files with an identical size and mtime are assumed unchanged (copies made by SlabCLI
+    preserve mtimes), and anything else is hashed using the fingerprint cache so unchanged
+    files are never re-read on later runs.
+
+    :param include: Optional predicate taking a full file path, files it rejects are ignored
+    :param cache: Fingerprint cache from fingerprint.load_cache(), updated in place
+    :param normalise: Optional function taking (source path, size, mtime_ns) and returning the
+                      checksum the source file would have once synced (e.g. after config
+                      replacements), or None if syncing copies it unchanged
+    :return: Dict of {relative path: ADDED | REMOVED | MODIFIED | REPLACED}, relative to source -> dest,
+             where REPLACED files only differ by what `normalise` accounts for
+    """
+    cache = {} if cache is None else cache
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        source_scan = pool.submit(fingerprint.scan_tree, source_root, include, workers)
+        dest_scan = pool.submit(fingerprint.scan_tree, dest_root, include, workers)
+        source_files, dest_files = source_scan.result(), dest_scan.result()
+
+    changes = {}
+    to_hash = []
+    for rel_path, (size, mtime_ns) in source_files.items():
+        dest_stat = dest_files.get(rel_path)
+        if dest_stat is None:
+            changes[rel_path] = ADDED
+        elif dest_stat[0] != size or dest_stat[1] != mtime_ns:
+            to_hash.append(rel_path)
+    for rel_path in dest_files.keys() - source_files.keys():
+        changes[rel_path] = REMOVED
+
+    def classify(rel_path):
+        source_path = os.path.join(source_root, rel_path)
+        dest_path = os.path.join(dest_root, rel_path)
+        normalised_sum = normalise(source_path, *source_files[rel_path]) if normalise else None
+        # Without normalisation, files of different sizes can't match, so there is no need to read them
+        if normalised_sum is None and source_files[rel_path][0] != dest_files[rel_path][0]:
+            return MODIFIED
+        source_sum = fingerprint.cached_checksum(source_path, cache, *source_files[rel_path])
+        dest_sum = fingerprint.cached_checksum(dest_path, cache, *dest_files[rel_path])
+        if source_sum == dest_sum:
+            return None
+        return REPLACED if normalised_sum == dest_sum else MODIFIED
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for rel_path, change in zip(to_hash, pool.map(classify, to_hash)):
+            if change:
+                changes[rel_path] = change
+
+    return changes
+
+def group_by_plugin(changes):
+    """Group changed paths by plugin folder, e.g. 'plugins/Foo/config.yml' -> 'Foo'. Plugin jars and other files fall under 'plugins' and 'server'."""
+    groups = {}
+    for rel_path, change in sorted(changes.items()):
+        parts = rel_path.split(os.sep)
+        if parts[0] == "plugins" and len(parts) > 2:
+            group = parts[1]
+        elif parts[0] == "plugins":
+            group = "plugins"
+        else:
+            group = "server"
+        groups.setdefault(group, []).append((rel_path, change))
+    return groups
@@ -0,0 +1,79 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from slabcli import config
+from slabcli.common.utils import file_checksum
+
+CACHE_FILE = "fingerprints.json"
+DEFAULT_WORKERS = 8
+
+
+def load_cache():
+    """Load the persistent {path: [size, mtime_ns, checksum]} cache, or an empty one if missing/corrupt."""
+    try:
+        with config.get_state_path(CACHE_FILE).open("r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(cache):
+    path = config.get_state_path(CACHE_FILE)
+    tmp_path = str(path) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, path)
+
+def cached_result(cache, key, size, mtime_ns, compute):
+    """Return the cached result for `key`, only calling `compute()` if the file's size or mtime changed since it was cached."""
+    entry = cache.get(key)
+    if entry and entry[0] == size and entry[1] == mtime_ns:
+        return entry[2]
+    result = compute()
+    cache[key] = [size, mtime_ns, result]
+    return result
+
+def cached_checksum(path, cache, size, mtime_ns):
+    """Return the checksum of `path`, only reading the file if its size or mtime changed since it was cached."""
+    return cached_result(cache, path, size, mtime_ns, lambda: file_checksum(path))
+
+def scan_tree(root, include=None, workers=DEFAULT_WORKERS, directories=False):
+    """
+    Stat every file under `root`, walking each top-level directory in parallel.
+
+    :param root: Directory to scan
+    :param include: Optional predicate taking a full file or directory path, paths it rejects are skipped
+    :param directories: Also return the relative path of every directory under `root`
+    :return: Dict of {relative path: (size, mtime_ns)}, or ({relative path: (size, mtime_ns)}, {relative directory path}) with `directories`
+    """
+    def walk(directory):
+        found = {}
+        found_dirs = set()
+        for dirpath, dirs, filenames in os.walk(directory):
+            if directories and (not include or include(dirpath)):
+                found_dirs.add(os.path.relpath(dirpath, root))
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if include and not include(path):
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found[os.path.relpath(path, root)] = (st.st_size, st.st_mtime_ns)
+        return found, found_dirs
+
+    results = {}
+    result_dirs = set()
+    subdirs = []
+    for entry in os.scandir(root):
+        if entry.is_dir(follow_symlinks=False):
+            subdirs.append(entry.path)
+        elif entry.is_file() and (not include or include(entry.path)):
+            st = entry.stat()
+            results[entry.name] = (st.st_size, st.st_mtime_ns)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for found, found_dirs in pool.map(walk, subdirs):
+            results.update(found)
+            result_dirs.update(found_dirs)
+    return (results, result_dirs) if directories else results
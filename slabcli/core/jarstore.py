@@ -0,0 +1,112 @@
+import os
+import time
+import fcntl
+import shutil
+import tempfile
+from slabcli.core import fingerprint
+
+TMP_SUFFIX = ".slabcli-tmp"
+FICLONE = 0x40049409      # Linux ioctl for a copy-on-write clone (reflink), supported by btrfs, XFS, etc.
+DEFAULT_PRUNE_DAYS = 30   # store entries not used by any push/pull for this long are removed
+
+
+def get_store_dir(cfg):
+    """Return the jar store directory from config.yml, or None if the jar store is disabled."""
+    return cfg.get("jar_store", {}).get("directory")
+
+def get_prune_days(cfg):
+    return int(cfg.get("jar_store", {}).get("prune_days", DEFAULT_PRUNE_DAYS))
+
+def is_plugin_jar(path):
+    return path.lower().endswith(".jar") and os.path.basename(os.path.dirname(path)) == "plugins"
+
+def entry_path(store_dir, digest):
+    return os.path.join(store_dir, digest[:2], digest + ".jar")
+
+def clone_file(source, dest, stat_source=None):
+    """
+    Atomically replace `dest` with a reflink of `source`, falling back to a plain copy if the
+    filesystem doesn't support reflinks. Reflinks share data blocks but are copy-on-write,
+    so writing to either file afterwards never changes the other.
+
+    :param stat_source: File to copy permissions and timestamps from, defaults to `source`
+    :return: True if the file was reflinked, False if it had to be copied
+    """
+    tmp_path = dest + TMP_SUFFIX
+    try:
+        with open(source, "rb") as src, open(tmp_path, "wb") as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                cloned = True
+            except OSError:
+                cloned = False
+        if not cloned:
+            shutil.copyfile(source, tmp_path)
+        shutil.copystat(stat_source or source, tmp_path)
+        os.replace(tmp_path, dest)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return cloned
+
+def supports_reflinks(store_dir, dest_dir):
+    """Return True if files in `store_dir` can be reflinked into `dest_dir`, i.e. both are on one reflink-capable filesystem."""
+    os.makedirs(store_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=store_dir, suffix=TMP_SUFFIX) as src, \
+         tempfile.NamedTemporaryFile(dir=dest_dir, suffix=TMP_SUFFIX) as dst:
+        src.write(b"slabcli")
+        src.flush()
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return True
+        except OSError:
+            return False
+
+def ingest(path, store_dir, cache):
+    """
+    Add a plugin jar to the store by content hash, as a reflink of `path` where possible.
+    The source jar itself is only read, never replaced or modified.
+
+    :param cache: Fingerprint cache from fingerprint.load_cache(), so unchanged jars aren't re-hashed
+    :return: Path of the store entry
+    """
+    st = os.stat(path)
+    digest = fingerprint.cached_checksum(path, cache, st.st_size, st.st_mtime_ns)
+    entry = entry_path(store_dir, digest)
+
+    if not os.path.exists(entry):
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        clone_file(path, entry)
+
+    # Mark the entry as recently used, so prune() keeps it
+    os.utime(entry)
+    return entry
+
+def copy_function(store_dir, cache, stats):
+    """
+    Build a drop-in replacement for shutil.copy2 that reflinks plugin jars from the store
+    and copies every other file as normal.
+
+    :param stats: Dict that counts 'reflinked' and 'copied' jars, updated in place
+    """
+    def copy(source, dest, *, follow_symlinks=True):
+        if not is_plugin_jar(source):
+            return shutil.copy2(source, dest, follow_symlinks=follow_symlinks)
+        if os.path.isdir(dest):
+            dest = os.path.join(dest, os.path.basename(source))
+        entry = ingest(source, store_dir, cache)
+        stats["reflinked" if clone_file(entry, dest, stat_source=source) else "copied"] += 1
+        return dest
+    return copy
+
+def prune(store_dir, max_age_days=DEFAULT_PRUNE_DAYS):
+    """Remove store entries that no push/pull has used for `max_age_days`, returning how many were removed."""
+    removed = 0
+    cutoff = time.time() - max_age_days * 86400
+    for root, dirs, files in os.walk(store_dir):
+        for file in files:
+            path = os.path.join(root, file)
+            if os.stat(path).st_mtime < cutoff:
+                os.remove(path)
+                removed += 1
+    return removed
@@ -0,0 +1,160 @@
+import io
+import os
+import re
+import hashlib
+import shutil
+import tempfile
+
+CHUNK_SIZE = 1024 * 1024  # characters read per chunk
+SNIFF_SIZE = 8192         # bytes checked for binary content
+
+
+def is_binary(path):
+    """Return True if the start of a file looks binary (contains a NUL byte), e.g. a .txt that is actually a data dump."""
+    with open(path, "rb") as f:
+        return b"\0" in f.read(SNIFF_SIZE)
+
+def compile_replacements(replacements):
+    """
+    Build a single regex matching every replacement key, longest keys first so a key
+    that contains another key always wins.
+
+    :return: (compiled pattern, {key: value} with string keys/values, length of the longest key),
+             or (None, {}, 0) if there is nothing to replace
+    """
+    str_replacements = {str(k): str(v) for k, v in replacements.items() if str(k)}
+    if not str_replacements:
+        return None, {}, 0
+    keys = sorted(str_replacements, key=len, reverse=True)
+    pattern = re.compile("|".join(re.escape(k) for k in keys))
+    return pattern, str_replacements, len(keys[0])
+
+def stream_replace(src, dst, pattern, replacements, max_key_len, chunk_size=CHUNK_SIZE, digest=None):
+    """
+    Copy text from `src` to `dst` replacing every key, reading at most one chunk at a time.
+
+    The last `max_key_len - 1` characters of each chunk are carried over to the next one,
+    so keys that span a chunk boundary are still matched.
+
+    :param dst: Writable text file, or None to only find which keys are present
+    :param digest: Optional hashlib object, updated with the UTF-8 text written to `dst`,
+                   or with the text read from `src` if `dst` is None
+    :return: Set of keys that were found
+    """
+    found = set()
+    carry = ""
+    while True:
+        chunk = src.read(chunk_size)
+        if digest is not None and dst is None:
+            digest.update(chunk.encode("utf-8"))
+        buffer = carry + chunk
+        # Only matches starting before `safe` are guaranteed to be complete and longest-first
+        safe = len(buffer) - (max_key_len - 1) if chunk else len(buffer)
+
+        out = []
+        pos = 0
+        for match in pattern.finditer(buffer):
+            if match.start() >= safe:
+                break
+            out.append(buffer[pos:match.start()])
+            out.append(replacements[match.group()])
+            found.add(match.group())
+            pos = match.end()
+
+        emit_end = max(pos, safe)
+        out.append(buffer[pos:emit_end])
+        carry = buffer[emit_end:]
+        if dst is not None:
+            text = "".join(out)
+            dst.write(text)
+            if digest is not None:
+                digest.update(text.encode("utf-8"))
+
+        if not chunk:
+            return found
+
+class HashWriter:
+    """Write-only text sink that hashes everything written to it as UTF-8."""
+
+    def __init__(self):
+        self.digest = hashlib.sha256()
+
+    def write(self, text):
+        self.digest.update(text.encode("utf-8"))
+
+def replaced_checksum(path, replacement_sets, chunk_size=CHUNK_SIZE):
+    """
+    Return the SHA-256 a text file would have after applying each set of replacements in turn,
+    without writing anything. The last set is streamed, but earlier sets hold the intermediate
+    text in memory, so only use more than one set for small files.
+
+    :return: Hex digest, or None if the file is binary or not valid UTF-8
+    """
+    if is_binary(path):
+        return None
+    sink = HashWriter()
+    try:
+        with open(path, encoding="utf-8", newline="") as src:
+            compiled = [c for c in map(compile_replacements, replacement_sets) if c[0] is not None]
+            for i, (pattern, str_replacements, max_key_len) in enumerate(compiled):
+                dst = sink if i == len(compiled) - 1 else io.StringIO()
+                stream_replace(src, dst, pattern, str_replacements, max_key_len, chunk_size)
+                if dst is not sink:
+                    src = io.StringIO(dst.getvalue())
+            if not compiled:
+                while chunk := src.read(chunk_size):
+                    sink.write(chunk)
+    except UnicodeDecodeError:
+        return None
+    return sink.digest.hexdigest()
+
+def rewrite_file(path, replacements, write=True, chunk_size=CHUNK_SIZE):
+    """
+    Apply replacements to a text file in bounded memory.
+
+    Files are scanned first, and only files that contain a key are rewritten. The new
+    content is streamed into a temporary file next to the original, which then
+    atomically replaces it with the original's permissions and ownership, so a crash
+    part-way through never leaves a half-written config behind. Line endings are kept as-is.
+
+    :param write: If False, only report which replacements would be made
+    :return: (list of 'key -> value' changes made or that would be made, SHA-256 of the file's
+             content afterwards). Changes are None if the file is binary or not valid UTF-8 and
+             was skipped, and the checksum is None if the file wasn't read.
+    """
+    pattern, str_replacements, max_key_len = compile_replacements(replacements)
+    if pattern is None:
+        return [], None
+    if is_binary(path):
+        return None, None
+
+    path = os.path.realpath(path)  # rewrite the target of a symlink, not the link itself
+    tmp_path = None
+    try:
+        with open(path, encoding="utf-8", newline="") as src:
+            # Most files need no changes, so scan without writing first and only rewrite if a key was found
+            digest = hashlib.sha256()
+            found = stream_replace(src, None, pattern, str_replacements, max_key_len, chunk_size, digest)
+            if found and write:
+                src.seek(0)
+                digest = hashlib.sha256()
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix="." + os.path.basename(path) + ".", suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8", newline="") as dst:
+                    stream_replace(src, dst, pattern, str_replacements, max_key_len, chunk_size, digest)
+
+        if tmp_path:
+            st = os.stat(path)
+            shutil.copymode(path, tmp_path)
+            try:
+                os.chown(tmp_path, st.st_uid, st.st_gid)
+            except PermissionError:
+                pass
+            os.replace(tmp_path, path)
+            tmp_path = None
+    except UnicodeDecodeError:
+        return None, None
+    finally:
+        if tmp_path:
+            os.remove(tmp_path)
+
+    return [f"{k} -> {v}" for k, v in str_replacements.items() if k in found], digest.hexdigest()
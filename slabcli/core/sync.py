@@ -5,6 +5,7 @@ import shutil
 import yaml
 from slabcli import config
 from slabcli.common.cli import clifmt
+from slabcli.core import config_index, database, fingerprint, jarstore, rewrite
 from slabcli.core.ptero import stop_servers, restart_servers
 from slabcli.common.utils import file_has_extension, file_newer_than, print_directory_contents, substring_in_string
 
@@ -16,6 +17,7 @@ PUSH = "push"
 PULL = "pull"
 
 PTERO_ROOT = "/srv/daemon-data/"
+CONFIG_EXTENSIONS = (".conf", ".txt", ".properties", ".yml", "yaml")
 SERVER_TYPE = {PUSH: "SMP ", PULL: "test-"}
 SERVER_DIRECTIONS = {PUSH: ("staging", "production"), PULL: ("production", "staging")}
 
@@ -37,22 +39,32 @@ def run(args, cfg):
     # Build list of paths to exclude from processing (e.g. world files or user-specified paths)
     exempt_paths = list(cfg["replacements"].get("exempt_" + args.direction + "_paths", []))
 
-    replacements, missing_keys = config.compute_config_replacements(
-        cfg["replacements"].get(source, {}),
-        cfg["replacements"].get(dest, {})
-    )
-    # Validate that all necessary replacement keys are present
-    if missing_keys:
-        raise ValueError("Cannot update servers: missing replacement keys in config.yml")
-
-    source_servers = cfg["servers"].get(source, {})
-    dest_servers = cfg["servers"].get(dest, {})
+    # Reuse the replacements from the last run if the source/destination config hasn't changed
+    index = config_index.load_index()
+    source_cfg = cfg["replacements"].get(source, {})
+    dest_cfg = cfg["replacements"].get(dest, {})
+    replacements = config_index.cached_replacements(index, args.direction, source_cfg, dest_cfg)
+    if replacements is None:
+        replacements, missing_keys = config.compute_config_replacements(source_cfg, dest_cfg)
+        # Validate that all necessary replacement keys are present
+        if missing_keys:
+            raise ValueError("Cannot update servers: missing replacement keys in config.yml")
+        config_index.cache_replacements(index, args.direction, source_cfg, dest_cfg, replacements)
+
+    # Narrow the sync down to the servers and subtrees selected with --server / --path, if any
+    source_servers = select_servers(cfg["servers"].get(source, {}), getattr(args, "servers", None))
+    dest_servers = select_servers(cfg["servers"].get(dest, {}), getattr(args, "servers", None))
+    paths = normalise_paths(getattr(args, "paths", None))
 
     # Debug output to verify the setup before proceeding
     print(clifmt.LIGHT_GRAY + "replacements dict =", replacements)
     print(clifmt.LIGHT_GRAY + "source_servers =", source_servers)
     print(clifmt.LIGHT_GRAY + "dest_servers =", dest_servers)
     print(clifmt.LIGHT_GRAY + "exempt paths =", exempt_paths)
+    if paths:
+        print(clifmt.LIGHT_GRAY + "scoped paths =", paths)
+        # Update-only runs copy nothing and only rewrite the destination, so that's where the paths must exist
+        check_paths_exist(dest_servers if args.update_only else source_servers, paths)
 
     if args.dry_run:
         global clicolor, print_prefix, should_sync
@@ -62,24 +74,43 @@ def run(args, cfg):
         print(f"Running {args.direction} in {print_prefix}mode...")
         time.sleep(3)
 
+    databases_synced = True
+
     if not args.update_only:
     # Step 1: Stop destination servers via Pterodactyl API unless we're in update-only or dry-run mode
         if should_sync:
             stop_servers(dest_servers)
 
     # Step 2: Sync files from source to destination unless we're in update-only mode
-        sync_server_files(args, cfg, source_servers, dest_servers, exempt_paths)
+        sync_server_files(args, cfg, source_servers, dest_servers, exempt_paths, paths)
+
+    # Step 2.5: Copy plugin database tables from source to destination, if requested
+        if getattr(args, "databases", False):
+            if not database.sync_databases(args, cfg, source, dest, print_prefix, getattr(args, "servers", None)):
+                databases_synced = False
+                print(clifmt.FAIL + f"Some {dest.capitalize()} database tables failed to sync, see errors above")
+
+    # Both config passes share one ruleset, and record each processed file's checksum for the index
+    ruleset = config_index.ruleset_hash([replacements, coreprotect_replacements(args.direction)], exempt_paths)
+    checksums = {}
 
     # Step 3: Update server config files with any replacements
-    update_config_files(args, source_servers, dest_servers, replacements, exempt_paths, False)
+    update_config_files(args, source_servers, dest_servers, replacements, exempt_paths, False, paths, index, ruleset, checksums)
 
     # Step 3.5 Update CoreProtect / MineProtect config files, to handle an unfortunate port issue we created
     # The Staging port '3307' maps to '3306' in Production *except* for Coreprotect/Mineprotect, which uses '3308'
     # This should be fixed in the future, and makes Marine very sad for it breaking the "Prod is Staging" philosophy.
-    update_config_files(args, source_servers, dest_servers, replacements, exempt_paths, True)
+    update_config_files(args, source_servers, dest_servers, replacements, exempt_paths, True, paths, index, ruleset, checksums)
 
-    # Step 4: Log or persist the timestamp of this sync operation
+    # Persist the replacements and the final state of each processed file, so later update-only runs can skip unchanged files
     if should_sync:
+        for path, checksum in checksums.items():
+            config_index.record(index, path, checksum, ruleset)
+        config_index.prune(index)
+        config_index.save_index(index)
+
+    # Step 4: Log or persist the timestamp of this sync operation, which only makes sense for a complete, successful sync
+    if should_sync and databases_synced and not getattr(args, "servers", None) and not paths:
         update_sync_timestamps(args, cfg)
 
     # Step 5: Optionally restart the servers
@@ -88,8 +119,72 @@ def run(args, cfg):
         if y == "y":
             restart_servers(dest_servers)
 
-def sync_server_files(args, cfg, source_servers, dest_servers, exempt_paths):
+    # Config files were still updated above so Staging never keeps Production's values, but the run has failed
+    if not databases_synced:
+        print(clifmt.FAIL + f"The {args.direction} completed with database errors, so its timestamp was not recorded")
+        exit(1)
+
+def select_servers(servers, names):
+    """Return only the servers named with --server, or every server if none were named."""
+    if not names:
+        return servers
+    unknown = set(names) - servers.keys()
+    if unknown:
+        raise ValueError(f"Unknown server(s): {', '.join(sorted(unknown))}. Expected one of: {', '.join(servers)}")
+    return {name: servers[name] for name in servers if name in names}
+
+def normalise_paths(paths):
+    """Clean up --path values into relative paths such as 'plugins/Foo', rejecting any that escape the server root."""
+    if not paths:
+        return None
+    normalised = []
+    for path in paths:
+        rel_path = os.path.normpath(path.strip("/\\"))
+        if rel_path in (".", "") or rel_path.startswith(".."):
+            raise ValueError(f"Invalid path: {path}. Paths must be inside the server root, e.g. plugins/Foo")
+        normalised.append(rel_path)
+    return normalised
+
+def check_paths_exist(servers, paths):
+    """Raise before anything is stopped or changed if a --path doesn't exist on any of the given servers."""
+    for rel_path in paths:
+        if not any(os.path.exists(os.path.join(PTERO_ROOT + server_id, rel_path)) for server_id in servers.values()):
+            raise FileNotFoundError(f"Path {rel_path} does not exist on any selected server: {', '.join(servers)}")
+
+def walk_scoped(server_root, paths=None):
+    """os.walk() over a server root, or only over the given subtrees of it.
+
+    Paths that point at a file yield just that file. Paths that point at a directory first yield
+    the directory itself from its parent, so callers see it exactly as they would in a full walk.
+    """
+    if not paths:
+        yield from os.walk(server_root)
+        return
+    for rel_path in paths:
+        top = os.path.join(server_root, rel_path)
+        if os.path.isfile(top):
+            yield os.path.dirname(top), [], [os.path.basename(top)]
+        elif os.path.isdir(top):
+            yield os.path.dirname(top), [os.path.basename(top)], []
+            yield from os.walk(top)
+
+def sync_server_files(args, cfg, source_servers, dest_servers, exempt_paths, paths=None):
     """Dispatch sync by direction (PULL or PUSH)."""
+
+    # Plugin jars are reflinked through the content-addressed jar store if one is configured.
+    # Without reflinks the store would only add a second copy of every jar, so it's bypassed.
+    store_dir = jarstore.get_store_dir(cfg)
+    copy_function = shutil.copy2
+    dest_roots = [PTERO_ROOT + dest_servers[name] for name in source_servers
+                  if dest_servers.get(name) and os.path.isdir(PTERO_ROOT + dest_servers[name])]
+    if store_dir and dest_roots and not jarstore.supports_reflinks(store_dir, dest_roots[0]):
+        print(clifmt.WARNING + f"Jar store: {store_dir} can't be reflinked into the server files, copying plugin jars without the store")
+        store_dir = None
+    if store_dir:
+        cache = fingerprint.load_cache()
+        jar_stats = {"reflinked": 0, "copied": 0}
+        copy_function = jarstore.copy_function(store_dir, cache, jar_stats)
+
     for name in source_servers:
         source_server_root = PTERO_ROOT + source_servers[name]
         dest_server_root = PTERO_ROOT + dest_servers.get(name, "")
@@ -101,20 +196,43 @@ def sync_server_files(args, cfg, source_servers, dest_servers, exempt_paths):
             raise FileNotFoundError(f"Destination path does not exist: {dest_server_root}")
 
         if args.direction == PULL:
-            sync_pull(args, cfg, name, source_server_root, dest_server_root, exempt_paths)
+            sync_pull(args, cfg, name, source_server_root, dest_server_root, exempt_paths, copy_function, paths)
         elif args.direction == PUSH:
-            sync_push(args, cfg, name, source_server_root, dest_server_root, exempt_paths)
+            sync_push(args, cfg, name, source_server_root, dest_server_root, exempt_paths, copy_function, paths)
+
+    if store_dir and should_sync:
+        fingerprint.save_cache(cache)
+        print(f"Jar store: reflinked {jar_stats['reflinked']} plugin jars ({jar_stats['copied']} copied, as reflinks weren't supported)")
+        print(f"Jar store: pruned {jarstore.prune(store_dir, jarstore.get_prune_days(cfg))} unused plugin jars from {store_dir}")
+
+def sync_pull(args, cfg, name, source_server_root, dest_server_root, exempt_pull_paths, copy_function=shutil.copy2, paths=None):
+    """Sync an entire server directory, or only the given subtrees of it, from source to destination for PULL direction."""
+    for rel_path in paths or [""]:
+        source_root = os.path.join(source_server_root, rel_path) if rel_path else source_server_root
+        dest_root = os.path.join(dest_server_root, rel_path) if rel_path else dest_server_root
+
+        # Like a push, servers that don't have a selected path are left alone rather than wiped
+        if not os.path.exists(source_root):
+            print(f"{print_prefix}Skipping {rel_path} for {SERVER_TYPE[args.direction]}{name}, as it does not exist on SMP {name}")
+            continue
 
-def sync_pull(args, cfg, name, source_server_root, dest_server_root, exempt_pull_paths):
-    """Sync an entire server directory from source to destination for PULL direction."""
-    clear_directory_pull(args, dest_server_root, name)
+        # A single file only needs replacing, rather than clearing and copying a whole directory
+        if os.path.isfile(source_root):
+            print(f"{print_prefix}Copying SMP {name} {source_root.removeprefix(PTERO_ROOT)} -> {dest_root.removeprefix(PTERO_ROOT)}")
+            if should_sync:
+                os.makedirs(os.path.dirname(dest_root), exist_ok=True)
+                copy_function(source_root, dest_root)
+            continue
 
-    print(f"{print_prefix}Recursively copying SMP {name} directory to {SERVER_TYPE[args.direction]}{name}: "
-          f"{source_server_root.removeprefix(PTERO_ROOT)} -> {dest_server_root.removeprefix(PTERO_ROOT)}")
-    if should_sync:
-        shutil.copytree(source_server_root, dest_server_root, dirs_exist_ok=True, ignore=shutil.ignore_patterns(*exempt_pull_paths))
-    else:
-        print_directory_contents(source_server_root, exempt_pull_paths)
+        if os.path.isdir(dest_root):
+            clear_directory_pull(args, dest_root, name)
+
+        print(f"{print_prefix}Recursively copying SMP {name} directory to {SERVER_TYPE[args.direction]}{name}: "
+              f"{source_root.removeprefix(PTERO_ROOT)} -> {dest_root.removeprefix(PTERO_ROOT)}")
+        if should_sync:
+            shutil.copytree(source_root, dest_root, dirs_exist_ok=True, ignore=shutil.ignore_patterns(*exempt_pull_paths), copy_function=copy_function)
+        else:
+            print_directory_contents(source_root, exempt_pull_paths)
 
     # Cosmetic change for Staging, substitute the server icon to differentiate them in Minecraft's server browser
     stage_icon = os.path.join(dest_server_root, "server-icon-staging.png")
@@ -124,8 +242,8 @@ def sync_pull(args, cfg, name, source_server_root, dest_server_root, exempt_pull
         if should_sync:
             shutil.copy2(stage_icon, final_icon)
 
-def sync_push(args, cfg, name, source_server_root, dest_server_root, exempt_push_paths):
-    """Sync selected files from source to destination for PUSH direction."""
+def sync_push(args, cfg, name, source_server_root, dest_server_root, exempt_push_paths, copy_function=shutil.copy2, paths=None):
+    """Sync selected files from source to destination for PUSH direction, optionally only within the given subtrees."""
     push_paths = list(cfg["replacements"].get("allowed_push_paths", []))
     push_files = list(cfg["replacements"].get("allowed_push_files", []))
     push_filetypes = list(cfg["replacements"].get("allowed_push_filetypes", []))
@@ -134,9 +252,9 @@ def sync_push(args, cfg, name, source_server_root, dest_server_root, exempt_push
     print(clifmt.LIGHT_GRAY + f"Allowed files:", push_files) 
     print(clifmt.LIGHT_GRAY + f"Allowed filetypes:", push_filetypes) 
 
-    clear_directory_push(args, name, dest_server_root, push_paths, push_files)
+    clear_directory_push(args, name, dest_server_root, push_paths, push_files, paths)
 
-    for root, dirs, files in os.walk(source_server_root):
+    for root, dirs, files in walk_scoped(source_server_root, paths):
         rel_path = os.path.relpath(root, source_server_root)
         dest_path = os.path.join(dest_server_root, '' if rel_path == '.' else rel_path)
 
@@ -153,7 +271,7 @@ def sync_push(args, cfg, name, source_server_root, dest_server_root, exempt_push
                     print(f"{print_prefix}Copying {SERVER_TYPE[args.direction]}{name} {source_file.removeprefix(PTERO_ROOT)} -> {dest_file.removeprefix(PTERO_ROOT)}")
                     if should_sync:
                         os.makedirs(dest_path, exist_ok=True)
-                        shutil.copy2(source_file, dest_file)
+                        copy_function(source_file, dest_file)
 
 
 def should_push_file(file, push_paths, push_filetypes, push_files, exempt_push_paths):
@@ -183,12 +301,12 @@ def clear_directory_pull(args, directory, name):
                 shutil.rmtree(path)
                 pass
 
-def clear_directory_push(args, name, directory, push_paths, push_files):
-    """Remove allowed files/dirs inside `directory` when pushing (selective delete)."""
+def clear_directory_push(args, name, directory, push_paths, push_files, paths=None):
+    """Remove allowed files/dirs inside `directory` (or only the given subtrees of it) when pushing (selective delete)."""
 
     print(f"{print_prefix}Checking files to delete for {SERVER_TYPE[args.direction]}{name}")
 
-    for root, dirs, files in os.walk(directory, topdown=True):
+    for root, dirs, files in walk_scoped(directory, paths):
         for dir in dirs:
             dir_path = os.path.join(root, dir)
             if substring_in_string(push_paths, dir_path):
@@ -207,8 +325,13 @@ def clear_directory_push(args, name, directory, push_paths, push_files):
                     os.remove(path)
 
 
-def update_config_files(args, source_servers, dest_servers, replacements, exempt_paths, coreprotect_edge_case: bool):
-    """Apply replacements to config files in destination folders."""
+def update_config_files(args, source_servers, dest_servers, replacements, exempt_paths, coreprotect_edge_case: bool, paths=None,
+                        index=None, ruleset=None, checksums=None):
+    """Apply replacements to config files in destination folders, optionally only within the given subtrees.
+
+    If a config index is given, update-only runs skip files that are unchanged since they were last
+    processed with the same `ruleset`. The content hash of every processed file is stored in `checksums`.
+    """
 
     if coreprotect_edge_case:
         print(clifmt.BROWN + f"{print_prefix}Looping again to handle Coreprotect/Mineprotect edge case... please fix these ports in the future...")
@@ -221,63 +344,74 @@ def update_config_files(args, source_servers, dest_servers, replacements, exempt
     if args.dry_run and not args.update_only:
         servers_to_check = source_servers # in this case, the files wouldn't be copied yet, so check the source server
 
+    skipped = 0
+
     # Loop over each server name in the destination server map
     for server_name in servers_to_check:
         # Construct full path to the server's config files
         print(clifmt.WHITE + f"{print_prefix}Checking {SERVER_TYPE[args.direction]}{server_name} server: " + PTERO_ROOT + servers_to_log[server_name])
 
         # Walk through all directories and files within the server path
-        for root, dirs, files in os.walk(PTERO_ROOT + servers_to_check[server_name]):
+        for root, dirs, files in walk_scoped(PTERO_ROOT + servers_to_check[server_name], paths):
             for filename in files:
-                if filename.endswith((".conf", ".txt", ".properties", ".yml", "yaml")):
+                if filename.endswith(CONFIG_EXTENSIONS):
                     path = os.path.join(root, filename)
 
+                    # The CoreProtect pass only handles CoreProtect/MineProtect files
+                    if coreprotect_edge_case and not is_coreprotect_path(path):
+                        continue
+
+                    if index is not None and args.update_only and config_index.is_unchanged(index, path, ruleset):
+                        skipped += 1
+                        continue
+
                     if coreprotect_edge_case:
-                        if update_coreprotect_config_files(args, path, replacements, exempt_paths, servers_to_check[server_name], servers_to_log[server_name]):
+                        if update_coreprotect_config_files(args, path, replacements, exempt_paths, servers_to_check[server_name], servers_to_log[server_name], checksums):
                             count += 1
                     else:
                         # Attempt to process the file; increment count if it changed
-                        if process_config_file(args, path, replacements, exempt_paths, servers_to_check[server_name], servers_to_log[server_name]):
+                        if process_config_file(args, path, replacements, exempt_paths, servers_to_check[server_name], servers_to_log[server_name], checksums):
                             count += 1
 
     # Summarize number of files updated or that would be updated
     print(f"{clicolor}{print_prefix}Updated " + f"{count} " + f)
+    if skipped:
+        print(clifmt.LIGHT_GRAY + f"{print_prefix}Skipped {skipped} files unchanged since they were last updated")
 
 #TODO: remove this horrible edge case for CoreProtect/MineProtect in the future
-def update_coreprotect_config_files(args, path, replacements, exempt_paths, check_server, log_server):
-    if "/plugins/CoreProtect" in path or "/plugins/MineProtect" in path:
-        # CoreProtect/Mineprotect MUST end up as 3308 in Prod, 3307 in Staging. This new replacement dict handles dry-run and a real run.
-        r = {"3306":"3308","3307":"3308"} if args.direction == PUSH else {"3306":"3307","3308":"3307"}
-        if process_config_file(args, path, r, exempt_paths, check_server, log_server): return True
+def update_coreprotect_config_files(args, path, replacements, exempt_paths, check_server, log_server, checksums=None):
+    if is_coreprotect_path(path):
+        r = coreprotect_replacements(args.direction)
+        if process_config_file(args, path, r, exempt_paths, check_server, log_server, checksums): return True
         else: return False
-    
 
-def process_config_file(args, path, replacements, exempt_paths, check_server, log_server):
-    """Apply replacements to a config file if changes are needed."""
+def is_coreprotect_path(path):
+    return "/plugins/CoreProtect" in path or "/plugins/MineProtect" in path
 
-    # Open the file at 'path' and read its entire content.
-    with open(path) as f:
-        content = f.read()
+def coreprotect_replacements(direction):
+    # CoreProtect/Mineprotect MUST end up as 3308 in Prod, 3307 in Staging. This new replacement dict handles dry-run and a real run.
+    return {"3306":"3308","3307":"3308"} if direction == PUSH else {"3306":"3307","3308":"3307"}
 
-    # Initialize new_content with the original content and prepare a list to track changes.
-    new_content = content
-    changes = []
+def process_config_file(args, path, replacements, exempt_paths, check_server, log_server, checksums=None):
+    """Apply replacements to a config file if changes are needed, storing its resulting content hash in `checksums` if given."""
 
-    # Loop through each key-value pair in the replacements dictionary.
-    for key, value in replacements.items():
-        # If the current key is found in the content, record the change and perform the replacement.
-        if key in new_content:
-            changes.append(key + " -> " + value)
-            new_content = new_content.replace(key, value)
+    # Resolve short path for concise console logging
+    print_path = path.removeprefix(PTERO_ROOT).replace(check_server, log_server)
 
-    # Only continue if changes were made.
-    if new_content != content:
+    # Check if the file's path should be exempted from processing, in which case it's only scanned for logging.
+    exempt = substring_in_string(exempt_paths, path)
 
-        # Resolve short path for concise console logging
-        print_path = path.removeprefix(PTERO_ROOT).replace(check_server, log_server)
+    # Stream the file through the replacements, rewriting it atomically if any key is found.
+    changes, checksum = rewrite.rewrite_file(path, replacements, write=should_sync and not exempt)
+    if checksums is not None:
+        checksums[path] = checksum
+    if changes is None:
+        print(clifmt.LIGHT_GRAY + f"{print_prefix}Skipping {print_path} as it is binary or not valid UTF-8")
+        return False
 
-        # Check if the file's path should be exempted from processing.
-        if substring_in_string(exempt_paths, path):
+    # Only continue if changes were made.
+    if changes:
+        if exempt:
                 print(clifmt.LIGHT_GRAY +
                     f"{print_prefix}Skipping {print_path} as it contains an excluded directory or filetype"
                 )
@@ -285,9 +419,6 @@ def process_config_file(args, path, replacements, exempt_paths, check_server, lo
             print(clicolor +
                 f"{print_prefix}Writing new content to {print_path} (changes: {', '.join(changes)})"
             )
-            if should_sync:
-                with open(path, "w") as f:
-                    f.write(new_content)
             # Return True to indicate that changes were made.
             return True
     # Return False if no changes were made.